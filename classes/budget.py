@@ -6,33 +6,15 @@ to create an instance.
 
 import time
 import os
-import sys
-from datetime import datetime
 from termcolor import colored
-import gspread
-from google.oauth2.service_account import Credentials
 import pyinputplus as pyip
 from prettytable import PrettyTable
 
+from classes.records import MonthRecord, PlanAllocation
+from classes.session import MONTHS, QuitSession
 from classes.systemmixin import SystemMixin
-from classes.updatespreadsheetmixin import UpdateSpreadsheetMixin
-
-# Global Variables for Google API
-SCOPE = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive.file",
-    "https://www.googleapis.com/auth/drive"
-    ]
-CREDS = Credentials.from_service_account_file('creds.json')
-SCOPED_CREDS = CREDS.with_scopes(SCOPE)
-GSPREAD_CLIENT = gspread.authorize(SCOPED_CREDS)
-SHEET = GSPREAD_CLIENT.open('personal-budget')
-
-# Global Variables for app processes
-MONTH_NOW = datetime.now().strftime('%B')
-MONTHS = ['January', 'February', 'March', 'April',
-          'May', 'June', 'July', 'August', 'September',
-          'October', 'November', 'December']
+from classes.updatespreadsheetmixin import (NOT_FINITE,
+                                            UpdateSpreadsheetMixin)
 
 
 class Budget(SystemMixin, UpdateSpreadsheetMixin):
@@ -40,7 +22,10 @@ class Budget(SystemMixin, UpdateSpreadsheetMixin):
     The Budget class handles user options for calculations.
     """
 
-    def __init__(self):
+    def __init__(self, session):
+        self.session = session
+        self.session.load_layouts()
+        self.prefetch('Budget')
         self.main_menu()
         self.income = self.enter_income()
         self.plan_elements = self.choose_budget_plan()
@@ -85,7 +70,7 @@ class Budget(SystemMixin, UpdateSpreadsheetMixin):
                                        "to print in terminal:\n", "yellow"),
                                        numbered=True)
                 os.system('cls' if os.name == 'nt' else 'clear')
-                values = SHEET.worksheet(table).get_all_values()
+                values = self.session.worksheet(table).get_all_values()
                 table = PrettyTable()
                 table.field_names = values[0]
                 table.add_rows(values[1:])
@@ -97,7 +82,7 @@ class Budget(SystemMixin, UpdateSpreadsheetMixin):
 
             else:
                 os.system('clear')
-                sys.exit(0)
+                raise QuitSession()
 
     def choose_month(self):
         """
@@ -111,7 +96,7 @@ class Budget(SystemMixin, UpdateSpreadsheetMixin):
                                numbered=True)
 
         if month == 'Present month':
-            month_calc = MONTH_NOW
+            month_calc = self.session.month_now
 
         elif month == 'Select month':
             while True:
@@ -126,7 +111,7 @@ class Budget(SystemMixin, UpdateSpreadsheetMixin):
                 time.sleep(5)
 
         else:
-            os.execl(sys.executable, sys.executable, *sys.argv)
+            self.reload_program()
 
         self.clear_display()
 
@@ -140,7 +125,8 @@ class Budget(SystemMixin, UpdateSpreadsheetMixin):
 
         self.clear_display()
 
-        all_values = SHEET.worksheet('general').get_all_records()
+        records = {dic['Month']: MonthRecord.from_record(dic)
+                   for dic in self.get_records('general')}
         month_calc = self.choose_month()
 
         while True:
@@ -154,31 +140,26 @@ class Budget(SystemMixin, UpdateSpreadsheetMixin):
             if input_decision == 'Enter monthly income':
                 self.clear_display()
                 income = pyip.inputFloat("Enter your monthly "
-                                         "income (-TAX): \n")
+                                         "income (-TAX): \n",
+                                         blockRegexes=NOT_FINITE)
                 self.update_worksheet_cell('general', income,
                                            month_calc, 'Monthly Income')
                 break
 
             if input_decision == 'Get income from spreadsheet':
+                record = records.get(month_calc)
 
-                try:
-                    for dic in all_values:
-                        if dic['Month'] == month_calc and \
-                           dic['Monthly Income'] != '':
-                            income = dic['Monthly Income']
-                        elif (dic['Month'] == month_calc and
-                              dic['Monthly Income'] == ''):
-                            raise TypeError()
+                if record is not None and record.income is not None:
+                    income = record.income
                     break
 
-                except TypeError:
-                    print("Something went wrong. Check if the name of columns "
-                          "and rows in spreadsheet are correct and if "
-                          "Monthly Income is not empty.\n")
-                    continue
+                print("Something went wrong. Check if the name of columns "
+                      "and rows in spreadsheet are correct and if "
+                      "Monthly Income is a number.\n")
+                continue
 
             else:
-                os.execl(sys.executable, sys.executable, *sys.argv)
+                self.reload_program()
 
         return income, month_calc
 
@@ -189,6 +170,7 @@ class Budget(SystemMixin, UpdateSpreadsheetMixin):
         """
 
         self.clear_display()
+        self.prefetch('Savings')
 
         while True:
             response = pyip.inputMenu(['About plans', '50/30/20', '70/20/10',
@@ -198,20 +180,14 @@ class Budget(SystemMixin, UpdateSpreadsheetMixin):
                                       numbered=True)
 
             if response == 'Back to Main Menu':
-                os.execl(sys.executable, sys.executable, *sys.argv)
+                self.reload_program()
 
             else:
 
                 try:
-                    if response == '50/30/20':
-                        needs = round(self.income[0] * 0.5, 1)
-                        wants = round(self.income[0] * 0.3, 1)
-                        savings = round(self.income[0] * 0.2, 1)
-                        break
-                    if response == '70/20/10':
-                        needs = round(self.income[0] * 0.7, 1)
-                        wants = round(self.income[0] * 0.2, 1)
-                        savings = round(self.income[0] * 0.1, 1)
+                    if response in ('50/30/20', '70/20/10'):
+                        plan = PlanAllocation.from_income(response,
+                                                          self.income[0])
                         break
                     if response == 'About plans':
                         self.clear_display()
@@ -241,20 +217,21 @@ class Budget(SystemMixin, UpdateSpreadsheetMixin):
                           "or enter income manually.")
                     self.restart_program()
 
-        return [response, needs, wants, savings]
+        return plan
 
-    def manage_your_budget(self, worksheet, surplus, savings, month):
+    def manage_your_budget(self, worksheet, spendings, month):
         """
         Manages SURPLUS values for selected worksheets.
-        Transfer SURPLUS to cell selected by the user.
+        Transfer SURPLUS to cell selected by the user and commits
+        worksheet spendings together with the transfer.
         """
 
         self.clear_display()
         print("Managing budget...\n")
         time.sleep(3)
 
-        month_cell = SHEET.worksheet('general').find(month)
-        savings_cell = SHEET.worksheet('general').find('Savings')
+        surplus = spendings.surplus
+        data = [self.spendings_range(worksheet, month, spendings)]
 
         if surplus < 0:
             self.clear_display()
@@ -263,29 +240,27 @@ class Budget(SystemMixin, UpdateSpreadsheetMixin):
             print("\nChecking possibles to manage your debt...")
             time.sleep(3)
 
-            cover = savings + surplus
+            cover = self.commit_transfer(month, 'Savings', surplus,
+                                         data, floor=0)
 
-            if cover < 0:
+            if cover is None:
                 print("\nYou don't have enough money for your spends! "
                       "You must reduce your costs!...")
                 self.restart_program()
 
             else:
                 print("\nEnough Savings to cover debt. "
-                      "Updating SURPLUS and Savings...")
-                time.sleep(3)
-                SHEET.worksheet('general').update_cell(month_cell.row,
-                                                       savings_cell.col, cover)
-                print("\nSURPLUS and Savings up-to-date.")
+                      "SURPLUS and Savings up-to-date.")
                 time.sleep(3)
 
         else:
             self.clear_display()
             print(f"Your Surplus for {self.color_worksheet_names(worksheet)} "
                   f"is {surplus}\n")
-            self.invset_money(month, month_cell, savings_cell, surplus)
+            self.invset_money(month, surplus, data)
 
-        print("\nBudget up-to-date!")
+        print(f"\n{self.color_worksheet_names(worksheet)} "
+              "worksheet and Budget up-to-date!")
         time.sleep(3)
 
         if worksheet == 'wants':
@@ -293,14 +268,11 @@ class Budget(SystemMixin, UpdateSpreadsheetMixin):
             print("Your budgeting is completed.")
             self.restart_program()
 
-    def invset_money(self, month, month_cell, savings_cell, surplus):
+    def invset_money(self, month, surplus, data):
         """
         Updates Savings or Extra in spreadsheet depending on user input.
         """
 
-        all_values = SHEET.worksheet('general').get_all_records()
-        extra_cell = SHEET.worksheet('general').find('Extra')
-
         add_money = pyip.inputMenu(['Savings', 'Extra Money',
                                     'Back to Main Menu'],
                                    prompt=colored("Select where to "
@@ -310,37 +282,16 @@ class Budget(SystemMixin, UpdateSpreadsheetMixin):
         if add_money == 'Savings':
             self.clear_display()
             print("Updating Savings value...\n")
-            time.sleep(3)
-
-            for dic in all_values:
-                if dic['Month'] == month:
-                    SHEET.worksheet('general').update_cell(
-                                                            month_cell.row,
-                                                            savings_cell.col,
-                                                            dic['Savings'] +
-                                                            surplus
-                                                            )
+            self.commit_transfer(month, 'Savings', surplus, data)
             print("Savings value up-to date!\n")
             time.sleep(3)
 
         elif add_money == 'Extra Money':
             self.clear_display()
             print("Updating Extra value...\n")
-            time.sleep(3)
-
-            for dic in all_values:
-                if dic['Month'] == month:
-
-                    if dic['Extra'] == '':
-                        SHEET.worksheet('general').update_cell(
-                            month_cell.row, extra_cell.col, surplus)
-                    else:
-                        SHEET.worksheet('general').update_cell(
-                            month_cell.row, extra_cell.col,
-                            dic['Extra']+surplus)
-
+            self.commit_transfer(month, 'Extra', surplus, data)
             print("Extra value up-to-date!")
             time.sleep(3)
 
         else:
-            os.execl(sys.executable, sys.executable, *sys.argv)
+            self.reload_program()
@@ -15,12 +15,12 @@ class Savings(SystemMixin, UpdateSpreadsheetMixin):
     Class to handle Savings calculations.
     """
 
-    def __init__(self, money, month):
+    def __init__(self, session, money, month):
+        self.session = session
         self.month = month
         self.money = money
-        self.update_worksheet_cell('general', self.money,
-                                   self.month, 'Savings')
-        self.update_worksheet_cell('general', '', self.month, 'Extra')
+        self.set_transfer_value(self.month, 'Savings', self.money)
+        self.set_transfer_value(self.month, 'Extra', 0)
 
 
 class Needs(SystemMixin, UpdateSpreadsheetMixin):
@@ -28,8 +28,10 @@ class Needs(SystemMixin, UpdateSpreadsheetMixin):
     Class to handle Needs calculations.
     """
 
-    def __init__(self, money):
+    def __init__(self, session, money):
+        self.session = session
         self.money = money
+        self.prefetch('Needs')
         self.categories_string = self.create_categories('needs',
                                                         'Housing,Vehicle,'
                                                         'Insurance,Food,'
@@ -43,8 +45,10 @@ class Wants(SystemMixin, UpdateSpreadsheetMixin):
     Class to handle Wants calculations.
     """
 
-    def __init__(self, money):
+    def __init__(self, session, money):
+        self.session = session
         self.money = money
+        self.prefetch('Wants')
         self.categories_string = self.create_categories(
             'wants', 'Enteraintment,Wellbeing,Travel')
         self.categories_list = self.update_worksheet_categories(
@@ -0,0 +1,185 @@
+"""
+This module contains SheetLayout class, describing where
+the header and month rows are located in a worksheet,
+and functions to keep layouts on disk between sessions.
+"""
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+from gspread.cell import Cell
+
+try:
+    import fcntl
+except ImportError:
+    # Windows, the cache file is last-writer-wins there
+    fcntl = None
+
+
+LAYOUT_CACHE_FILE = '.layout-cache.json'
+
+
+@dataclass
+class SheetLayout:
+    """
+    Header row, month column and month rows of a worksheet.
+    Data writes do not change the layout, so it can be reused
+    until headers are written again.
+    """
+
+    __slots__ = ('header_row', 'month_col', 'headers', 'months')
+
+    header_row: int
+    month_col: int
+    headers: tuple
+    months: dict
+
+    @classmethod
+    def from_values(cls, values, header='Month'):
+        """
+        Creates the layout from all worksheet values.
+        Returns None if there is no header cell in the worksheet.
+        """
+
+        for row, row_values in enumerate(values, 1):
+            if header in row_values:
+                month_col = row_values.index(header) + 1
+                break
+
+        else:
+            return None
+
+        headers = tuple(row_values)
+        while headers and headers[-1] == '':
+            headers = headers[:-1]
+
+        months = {}
+        for num, row_values in enumerate(values[row:], row + 1):
+            if len(row_values) >= month_col and row_values[month_col - 1]:
+                months[row_values[month_col - 1]] = num
+
+        return cls(row, month_col, headers, months)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates the layout from dictionary saved in the cache file.
+        """
+
+        return cls(int(data['header_row']), int(data['month_col']),
+                   tuple(data['headers']),
+                   {str(month): int(row)
+                    for month, row in data['months'].items()})
+
+    def matches(self, header_values, month_values):
+        """
+        Checks if header row and month column values, read from
+        the worksheet, still give the same layout.
+        """
+
+        values = [[''] * (self.month_col - 1) + row[:1]
+                  for row in month_values]
+        values += [[]] * (self.header_row - len(values))
+        values[self.header_row - 1] = header_values
+
+        return SheetLayout.from_values(values) == self
+
+    @property
+    def width(self):
+        """
+        Number of used columns in the header row.
+        """
+
+        return len(self.headers)
+
+    @property
+    def last_row(self):
+        """
+        Last month row number.
+        """
+
+        return max(self.months.values(), default=self.header_row)
+
+    def find(self, query):
+        """
+        Returns header or month cell matching the query, None if not found.
+        """
+
+        if query in self.headers:
+            return Cell(self.header_row, self.headers.index(query) + 1, query)
+
+        if query in self.months:
+            return Cell(self.months[query], self.month_col, query)
+
+        return None
+
+
+def read_layouts(spreadsheet_id, modified, path=LAYOUT_CACHE_FILE):
+    """
+    Returns layouts saved for the spreadsheet, if it was not modified
+    since they were saved. Otherwise returns an empty dictionary.
+    """
+
+    try:
+        with open(path, encoding='utf-8') as file:
+            entry = json.load(file).get(spreadsheet_id, {})
+
+        if entry.get('modified') != modified:
+            return {}
+
+        return {name: SheetLayout.from_dict(data)
+                for name, data in entry['layouts'].items()}
+
+    # Missing, unreadable or malformed cache file is a cache miss
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return {}
+
+
+@contextmanager
+def cache_lock(path):
+    """
+    Holds exclusive lock on the lock file next to the cache file,
+    so only one session at a time reads and rewrites the cache.
+    """
+
+    with open(f"{path}.lock", 'w', encoding='utf-8') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        yield
+
+
+def write_layouts(spreadsheet_id, modified, layouts, path=LAYOUT_CACHE_FILE):
+    """
+    Saves layouts of the spreadsheet with its modification time.
+    Layouts of other spreadsheets in the file are kept.
+    """
+
+    with cache_lock(path):
+        try:
+            with open(path, encoding='utf-8') as file:
+                cache = json.load(file)
+
+        except (OSError, ValueError):
+            cache = {}
+
+        cache[spreadsheet_id] = {
+            'modified': modified,
+            'layouts': {name: asdict(layout)
+                        for name, layout in layouts.items() if layout}}
+
+        # Complete file replaces the old one, readers never see half of it
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.')
+
+        try:
+            with os.fdopen(handle, 'w', encoding='utf-8') as file:
+                json.dump(cache, file)
+
+            os.replace(temp_path, path)
+
+        except BaseException:
+            os.remove(temp_path)
+            raise
@@ -0,0 +1,79 @@
+"""
+This module contains Prefetcher class, used to load worksheet data
+in background threads while the user is answering prompts.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+
+
+class Prefetcher:
+    """
+    Thread pool loading worksheet data ahead of time.
+    Loaded data is kept until the worksheet is written.
+    Keys are tuples with the worksheet name as the second element.
+    """
+
+    def __init__(self, max_workers=3):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='prefetch')
+        self.futures = {}
+        self.lock = Lock()
+
+    def schedule(self, key, loader):
+        """
+        Starts loading data in the background if it is not loaded yet.
+        """
+
+        with self.lock:
+            if key not in self.futures:
+                self.futures[key] = self.executor.submit(loader)
+
+    def get(self, key, loader):
+        """
+        Returns prefetched data, waits for it if it is still loading.
+        Data is loaded in the calling thread when it was not scheduled
+        or the background call failed, so errors show up as usual.
+        """
+
+        with self.lock:
+            future = self.futures.get(key)
+
+        if future is not None and future.exception() is None:
+            return future.result()
+
+        future = Future()
+        future.set_result(loader())
+
+        with self.lock:
+            self.futures[key] = future
+
+        return future.result()
+
+    def discard(self, worksheet):
+        """
+        Drops data loaded for the worksheet after it was written.
+        """
+
+        with self.lock:
+            for key in [key for key in self.futures if key[1] == worksheet]:
+                self.futures.pop(key).cancel()
+
+    def clear(self):
+        """
+        Drops all loaded data, loads not started yet are cancelled.
+        """
+
+        with self.lock:
+            for future in self.futures.values():
+                future.cancel()
+
+            self.futures.clear()
+
+    def shutdown(self):
+        """
+        Stops the thread pool, loads not started yet are cancelled.
+        """
+
+        self.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
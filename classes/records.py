@@ -0,0 +1,129 @@
+"""
+This module contains compact record classes for spreadsheet rows,
+with values parsed once into floats:
+- MonthRecord
+- CategoryRow
+- PlanAllocation
+"""
+
+from array import array
+from dataclasses import dataclass
+
+
+# Budget plans with Needs, Wants and Savings proportions
+PLANS = {'50/30/20': (0.5, 0.3, 0.2),
+         '70/20/10': (0.7, 0.2, 0.1)}
+
+
+def parse_amount(value, blank=0.0):
+    """
+    Returns spreadsheet value as float.
+    Blank cells are normalised to the blank argument.
+    """
+
+    if value in ('', None):
+        return blank
+
+    return float(value)
+
+
+def parse_field(value, blank=0.0):
+    """
+    Returns spreadsheet value as float, the same as parse_amount,
+    but a value that is not a number is returned as None.
+    """
+
+    try:
+        return parse_amount(value, blank)
+
+    except ValueError:
+        return None
+
+
+@dataclass
+class MonthRecord:
+    """
+    Row of the general worksheet.
+    Values that are not numbers are kept as None,
+    so they are reported only where they are used.
+    """
+
+    __slots__ = ('month', 'income', 'savings', 'extra')
+
+    month: str
+    income: float
+    savings: float
+    extra: float
+
+    @classmethod
+    def from_record(cls, dic):
+        """
+        Creates the record from get_all_records() dictionary.
+        Empty Monthly Income is kept as None.
+        """
+
+        return cls(dic['Month'],
+                   parse_field(dic['Monthly Income'], None),
+                   parse_field(dic['Savings']),
+                   parse_field(dic['Extra']))
+
+
+@dataclass
+class CategoryRow:
+    """
+    Month row of Needs or Wants worksheet.
+    Rows of the same worksheet share one categories tuple.
+    """
+
+    __slots__ = ('month', 'categories', 'amounts', 'total', 'surplus')
+
+    month: str
+    categories: tuple
+    amounts: array
+    total: float
+    surplus: float
+
+    @classmethod
+    def from_amounts(cls, month, categories, amounts, money):
+        """
+        Creates the row and calculates TOTAL and SURPLUS
+        for money available for the worksheet.
+        Categories tuple is stored as it is, not copied.
+        """
+
+        amounts = array('d', amounts)
+        total = sum(amounts, 0.0)
+
+        return cls(month, categories, amounts, total, money - total)
+
+    def row_values(self):
+        """
+        Returns values in the worksheet columns order, with TOTAL.
+        """
+
+        return [*self.amounts, self.total]
+
+
+@dataclass
+class PlanAllocation:
+    """
+    Budget plan chosen by the user with money for each element.
+    """
+
+    __slots__ = ('name', 'needs', 'wants', 'savings')
+
+    name: str
+    needs: float
+    wants: float
+    savings: float
+
+    @classmethod
+    def from_income(cls, name, income):
+        """
+        Splits income according to the plan proportions.
+        """
+
+        needs, wants, savings = (round(income * ratio, 1)
+                                 for ratio in PLANS[name])
+
+        return cls(name, needs, wants, savings)
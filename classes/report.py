@@ -0,0 +1,255 @@
+"""
+This module contains functions and writer classes
+to generate year-end reports.
+Spreadsheet rows are streamed through generators, aggregated
+per month and category, compared with the budget plan and
+written to CSV or HTML files line by line.
+"""
+
+import csv
+import html
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
+
+from classes.layout import SheetLayout
+from classes.records import PLANS, CategoryRow, MonthRecord, parse_amount
+from classes.session import Session
+
+
+UNFORMATTED = 'UNFORMATTED_VALUE'
+REPORT_FIELDS = ['Month', 'Element', 'Category', 'Spent', 'Planned',
+                 'Difference']
+
+
+def category_rows(values, money):
+    """
+    Returns CategoryRow for every month of Needs or Wants values,
+    with columns located by the worksheet layout.
+    Money is a function returning the plan value for the month.
+    """
+
+    layout = SheetLayout.from_values(values)
+
+    if layout is None:
+        return {}
+
+    categories = tuple(item for item in layout.headers[layout.month_col:]
+                       if item not in ('', 'TOTAL', 'SURPLUS'))
+    columns = [layout.headers.index(item) for item in categories]
+    rows = {}
+
+    for month, row in layout.months.items():
+        row_values = values[row - 1]
+        amounts = (parse_amount(row_values[col])
+                   if col < len(row_values) else 0.0 for col in columns)
+        rows[month] = CategoryRow.from_amounts(month, categories, amounts,
+                                               money(month))
+
+    return rows
+
+
+def month_rows(spreadsheet, plan):
+    """
+    Yields general record with Needs and Wants rows for every month
+    that has Monthly Income, joined on the month name.
+    Values are read unformatted, so currency or thousands separators
+    in the spreadsheet do not matter.
+    """
+
+    records = [MonthRecord.from_record(dic) for dic
+               in spreadsheet.worksheet('general').get_all_records(
+                   value_render_option=UNFORMATTED)]
+    incomes = {record.month: record.income or 0.0 for record in records}
+    elements = []
+
+    for worksheet, ratio in zip(('needs', 'wants'), PLANS[plan]):
+        def money(month, ratio=ratio):
+            return round(incomes.get(month, 0.0) * ratio, 1)
+
+        values = spreadsheet.worksheet(worksheet).get_all_values(
+            value_render_option=UNFORMATTED)
+        elements.append((category_rows(values, money), money))
+
+    for record in records:
+        if record.income is None:
+            continue
+
+        if record.savings is None or record.extra is None:
+            raise ValueError(f"Savings or Extra for {record.month} "
+                             "is not a number")
+
+        # Month missing in the worksheet is reported as nothing spent
+        yield (record, *(rows.get(record.month) or CategoryRow.from_amounts(
+            record.month, (), (), money(record.month))
+                         for rows, money in elements))
+
+
+def report_lines(rows, plan):
+    """
+    Yields report lines for every month and category,
+    followed by the whole year summary.
+    """
+
+    savings_ratio = PLANS[plan][2]
+    year = {}
+
+    def line(month, element, category, spent, planned=''):
+        year_spent, year_planned = year.get((element, category), (0.0, ''))
+
+        if planned != '':
+            year_planned = (year_planned or 0.0) + planned
+
+        year[(element, category)] = (year_spent + spent, year_planned)
+
+        return summary_line(month, element, category, spent, planned)
+
+    for record, *elements in rows:
+        for name, element in zip(('Needs', 'Wants'), elements):
+            for category, amount in zip(element.categories,
+                                        element.amounts):
+                yield line(record.month, name, category, amount)
+
+            yield line(record.month, name, 'TOTAL', element.total,
+                       element.total + element.surplus)
+
+        yield line(record.month, 'Savings', 'Savings', record.savings,
+                   round(record.income * savings_ratio, 1))
+        yield line(record.month, 'Savings', 'Extra', record.extra)
+
+    for (element, category), (spent, planned) in year.items():
+        yield summary_line('Year', element, category, spent, planned)
+
+
+def summary_line(month, element, category, spent, planned):
+    """
+    Returns report line, with difference if planned value is known.
+    """
+
+    if planned == '':
+        return [month, element, category, round(spent, 2), '', '']
+
+    return [month, element, category, round(spent, 2), round(planned, 2),
+            round(planned - spent, 2)]
+
+
+class CsvReport:
+    """
+    Writes report lines to CSV file one by one.
+    """
+
+    def __init__(self, file):
+        self.writer = csv.writer(file)
+        self.writer.writerow(REPORT_FIELDS)
+
+    def write(self, line):
+        """
+        Writes one report line.
+        """
+
+        self.writer.writerow(line)
+
+    def close(self):
+        """
+        CSV file does not need any closing content.
+        """
+
+
+class HtmlReport:
+    """
+    Writes report lines to HTML table one by one.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.file.write("<!DOCTYPE html>\n<html>\n<body>\n<table>\n<tr>")
+        self.file.write(''.join(f"<th>{field}</th>"
+                                for field in REPORT_FIELDS))
+        self.file.write("</tr>\n")
+
+    def write(self, line):
+        """
+        Writes one report line as table row.
+        """
+
+        self.file.write("<tr>")
+        self.file.write(''.join(f"<td>{html.escape(str(value))}</td>"
+                                for value in line))
+        self.file.write("</tr>\n")
+
+    def close(self):
+        """
+        Closes the table and the document.
+        """
+
+        self.file.write("</table>\n</body>\n</html>\n")
+
+
+REPORT_WRITERS = {'csv': CsvReport, 'html': HtmlReport}
+
+
+def generate_report(name, plan, formats, directory):
+    """
+    Generates report files for one spreadsheet in one pass over its data.
+    Returns paths of created files, files are removed if it fails.
+    """
+
+    # The same format twice would give two writers of one file
+    formats = list(dict.fromkeys(formats))
+    paths = [os.path.join(directory, f"{name}-report.{report_format}")
+             for report_format in formats]
+
+    try:
+        with Session(name) as session, ExitStack() as stack:
+            spreadsheet = session.sheet
+            reports = [REPORT_WRITERS[report_format](stack.enter_context(
+                           open(path, 'w', newline='', encoding='utf-8')))
+                       for report_format, path in zip(formats, paths)]
+
+            for line in report_lines(month_rows(spreadsheet, plan), plan):
+                for report in reports:
+                    report.write(line)
+
+            for report in reports:
+                report.close()
+
+    except BaseException:
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    return paths
+
+
+def report_job(name, plan, formats, directory):
+    """
+    Runs generate_report in a worker process.
+    Returns the spreadsheet name, created paths and error message,
+    so one failing spreadsheet does not stop reports for the others.
+    """
+
+    try:
+        return name, generate_report(name, plan, formats, directory), None
+
+    except Exception as error:  # pylint: disable=broad-except
+        return name, [], f"{type(error).__name__}: {error}"
+
+
+def generate_reports(names, plan, formats, directory, workers=None):
+    """
+    Generates reports for many spreadsheets in a process pool.
+    Yields spreadsheet name, created paths and error message
+    (None on success) as reports are completed.
+    """
+
+    # The same name twice would give two processes writing one file
+    names = list(dict.fromkeys(names))
+    os.makedirs(directory, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        jobs = [executor.submit(report_job, name, plan,
+                                formats, directory) for name in names]
+
+        for job in as_completed(jobs):
+            yield job.result()
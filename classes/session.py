@@ -0,0 +1,164 @@
+"""
+This module contains Session class, with the spreadsheet client,
+the clock and caches used by one budgeting session.
+"""
+
+from datetime import datetime
+from threading import RLock
+import gspread
+from gspread.urls import DRIVE_FILES_API_V3_URL
+from gspread.utils import rowcol_to_a1
+from google.oauth2.service_account import Credentials
+
+from classes.layout import read_layouts, write_layouts
+from classes.prefetch import Prefetcher
+
+
+# Google API scopes required by the program
+SCOPE = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive.file",
+    "https://www.googleapis.com/auth/drive"
+    ]
+MONTHS = ['January', 'February', 'March', 'April', 'May',
+          'June', 'July', 'August', 'September', 'October',
+          'November', 'December']
+
+
+class RestartSession(Exception):
+    """
+    Raised to start the session again from Main Menu.
+    """
+
+
+class QuitSession(Exception):
+    """
+    Raised to end the session.
+    """
+
+
+class Session:
+    """
+    Spreadsheet connection, clock and caches of one budgeting session.
+    Sessions do not share any state, so many of them can run
+    in separate threads of one process.
+    Use it as a context manager, or call close() when it is done.
+    Program flow ends with RestartSession or QuitSession, handled by
+    the caller, so other sessions of the process are not stopped.
+    """
+
+    def __init__(self, spreadsheet='personal-budget',
+                 creds_file='creds.json', clock=datetime.now):
+        self.spreadsheet = spreadsheet
+        self.creds_file = creds_file
+        self.clock = clock
+        self.worksheets = {}
+        self.layouts = {}
+        self.prefetcher = Prefetcher()
+        self.lock = RLock()
+        self._sheet = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def sheet(self):
+        """
+        Spreadsheet opened with the session's own client on first use.
+        """
+
+        with self.lock:
+            if self._sheet is None:
+                creds = Credentials.from_service_account_file(
+                    self.creds_file)
+                client = gspread.authorize(creds.with_scopes(SCOPE))
+                self._sheet = client.open(self.spreadsheet)
+
+        return self._sheet
+
+    @property
+    def month_now(self):
+        """
+        Name of the present month, checked every time it is used.
+        """
+
+        return self.clock().strftime('%B')
+
+    def worksheet(self, name):
+        """
+        Returns worksheet object, fetched from the spreadsheet only once.
+        """
+
+        with self.lock:
+            if name not in self.worksheets:
+                self.worksheets[name] = self.sheet.worksheet(name)
+
+            return self.worksheets[name]
+
+    def modified_time(self):
+        """
+        Returns time of the last spreadsheet modification from Drive.
+        """
+
+        response = self.sheet.client.request(
+            'get', f"{DRIVE_FILES_API_V3_URL}/{self.sheet.id}",
+            params={'fields': 'modifiedTime'})
+
+        return response.json()['modifiedTime']
+
+    def load_layouts(self):
+        """
+        Restores layouts saved in the previous session,
+        if the spreadsheet was not modified since then.
+        """
+
+        self.layouts.update(read_layouts(self.sheet.id, self.modified_time()))
+
+    def save_layouts(self):
+        """
+        Saves layouts which still match the spreadsheet, checked with
+        one batch read of their header rows and month columns.
+        Modification time is read before the check, so any change
+        made after it invalidates the saved layouts.
+        """
+
+        layouts = {name: layout for name, layout in self.layouts.items()
+                   if layout}
+
+        if not layouts:
+            return
+
+        modified = self.modified_time()
+        ranges = []
+
+        for name, layout in layouts.items():
+            column = rowcol_to_a1(1, layout.month_col)[:-1]
+            ranges += [f"'{name}'!{layout.header_row}:{layout.header_row}",
+                       f"'{name}'!{column}:{column}"]
+
+        response = self.sheet.values_batch_get(ranges)['valueRanges']
+        checked = {name: layout for (name, layout), headers, months
+                   in zip(layouts.items(), response[::2], response[1::2])
+                   if layout.matches(headers.get('values', [[]])[0],
+                                     months.get('values', []))}
+
+        if checked:
+            write_layouts(self.sheet.id, modified, checked)
+
+    def restart(self):
+        """
+        Drops data loaded in the finished run, layouts are kept.
+        """
+
+        self.prefetcher.clear()
+
+    def close(self):
+        """
+        Stops background loading of the session.
+        It can be called more than once.
+        """
+
+        self.prefetcher.shutdown()
@@ -4,12 +4,13 @@ used to clear the terminal and restart the program.
 """
 
 import os
-import sys
 import time
 from termcolor import colored
 import pyfiglet
 import pyinputplus as pyip
 
+from classes.session import QuitSession, RestartSession
+
 
 class SystemMixin:
     """
@@ -31,9 +32,18 @@ class SystemMixin:
                                              justify="center",
                                              width=80), "green"))
 
+    def reload_program(self):
+        """
+        Method to start the program again from Main Menu.
+        The session is started again by run.py.
+        """
+
+        raise RestartSession()
+
     def restart_program(self):
         """
         Method to restart or quit the program.
+        Only run.py ends the process, other sessions are not stopped.
         """
 
         # Code copied from
@@ -43,7 +53,7 @@ class SystemMixin:
                                           "yellow"))
 
         if restart == "yes":
-            os.execl(sys.executable, sys.executable, *sys.argv)
+            self.reload_program()
 
         else:
             self.clear_display()
@@ -51,4 +61,4 @@ class SystemMixin:
             print("\nSee you next time!")
             time.sleep(5)
             os.system('cls' if os.name == 'nt' else 'clear')
-            sys.exit(0)
+            raise QuitSession()
@@ -3,37 +3,42 @@ This module contains UpdateSpreadsheetMixin,
 with methods related to Google Sheets operations.
 """
 
-import os
-import sys
+import csv
+import math
+import re
 import time
-from datetime import datetime
+from uuid import uuid4
 import pyinputplus as pyip
 from termcolor import colored
-import gspread
-from google.oauth2.service_account import Credentials
-
-
-# Global Variables for Google API
-SCOPE = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive.file",
-    "https://www.googleapis.com/auth/drive"
-    ]
-CREDS = Credentials.from_service_account_file('creds.json')
-SCOPED_CREDS = CREDS.with_scopes(SCOPE)
-GSPREAD_CLIENT = gspread.authorize(SCOPED_CREDS)
-SHEET = GSPREAD_CLIENT.open('personal-budget')
-
-# Global Variables for app processes
-MONTH_NOW = datetime.now().strftime('%B')
-MONTHS = ['January', 'February', 'March', 'April', 'May',
-          'June', 'July', 'August', 'September', 'October',
-          'November', 'December']
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import a1_to_rowcol, rowcol_to_a1
+
+from classes.layout import SheetLayout
+from classes.records import CategoryRow, parse_amount
+
+
+# Data needed by the next step of the program flow,
+# None stands for the worksheet passed to prefetch method
+PREFETCH_FLOW = {
+    'Budget': (('records', 'general'), ('values', 'general')),
+    'Savings': (('values', 'general'),),
+    'Needs': (('values', 'needs'),),
+    'Wants': (('values', 'wants'),),
+    'manage_your_budget': (('values', 'general'), ('values', None)),
+}
+# nan and inf are accepted by float(), but the spreadsheet rejects them
+NOT_FINITE = [(r'(?i)nan|inf', 'This is not a number.')]
+# Savings and Extra cells sum rows of transfers worksheet with their set
+TRANSFER_FIELDS = ['Month', 'Column', 'Amount', 'Time', 'Set']
+TRANSFER_FORMULA = '=SUMIFS(transfers!C:C,transfers!E:E,"{}")'
+TRANSFER_SET = re.compile(r'^=SUMIFS\(transfers!C:C,\s*transfers!E:E,'
+                          r'\s*"(\w+)"\)$')
 
 
 class UpdateSpreadsheetMixin:
     """
     Mixin for functions related to spreadsheet operations.
+    Classes using this mixin keep their Session in session attribute.
     """
 
     @staticmethod
@@ -50,6 +55,69 @@ class UpdateSpreadsheetMixin:
 
         return name_worksheet
 
+    def prefetch(self, stage, worksheet=None):
+        """
+        Starts loading data for the program flow stage in the background.
+        Values are only used to create layouts, so they are not loaded
+        for worksheets with a known layout.
+        """
+
+        for kind, name in PREFETCH_FLOW[stage]:
+            name = name or worksheet
+
+            if kind == 'values' and name in self.session.layouts:
+                continue
+
+            loader = getattr(self, f"get_{kind}")(name, load=True)
+            self.session.prefetcher.schedule((kind, name), loader)
+
+    def get_values(self, worksheet, load=False):
+        """
+        Returns all worksheet values, prefetched if available.
+        With load argument returns the function loading them instead.
+        """
+
+        def loader():
+            return self.session.worksheet(worksheet).get_all_values()
+
+        if load:
+            return loader
+
+        return self.session.prefetcher.get(('values', worksheet), loader)
+
+    def get_records(self, worksheet, load=False):
+        """
+        Returns all worksheet records, prefetched if available.
+        With load argument returns the function loading them instead.
+        """
+
+        def loader():
+            return self.session.worksheet(worksheet).get_all_records()
+
+        if load:
+            return loader
+
+        return self.session.prefetcher.get(('records', worksheet), loader)
+
+    def get_layout(self, worksheet):
+        """
+        Returns worksheet layout, created from its values only once.
+        """
+
+        if worksheet not in self.session.layouts:
+            self.session.layouts[worksheet] = SheetLayout.from_values(
+                self.get_values(worksheet))
+
+        return self.session.layouts[worksheet]
+
+    def find_cell(self, worksheet, query):
+        """
+        Finds header or month cell matching the query in worksheet layout.
+        Returns None if the value was not found, the same as gspread.
+        """
+
+        return self.get_layout(worksheet).find(query)
+
     def update_worksheet_cell(self, worksheet, value, row, column):
         """
         Updates Google Sheet worksheet based on present month,
@@ -60,92 +128,420 @@ class UpdateSpreadsheetMixin:
         print(f"Updating {column} in worksheet...\n")
         time.sleep(3)
 
-        month_cell = SHEET.worksheet(worksheet).find(row)
-        month_income = SHEET.worksheet(worksheet).find(column)
-        SHEET.worksheet(worksheet).update_cell(month_cell.row,
-                                               month_income.col, value)
+        month_cell = self.find_cell(worksheet, row)
+        month_income = self.find_cell(worksheet, column)
+        self.session.worksheet(worksheet).update_cell(month_cell.row,
+                                                      month_income.col,
+                                                      value)
+        self.session.prefetcher.discard(worksheet)
 
         print(f"{column.title()} updated successfully!\n\n")
         time.sleep(3)
 
     def input_values_for_worksheet(self, worksheet, month, value):
         """
-        Return user input for individual categories.
+        Return user input for individual categories as CategoryRow.
+        Values can be entered one by one, in one line or from CSV file.
         """
 
+        self.prefetch('manage_your_budget', worksheet)
         self.clear_display()
-        month_cell = SHEET.worksheet(worksheet).find(month)
-        spendings = {}
+        categories = tuple(item for item in self.categories_list
+                           if item not in ('TOTAL', 'SURPLUS'))
 
-        for item in self.categories_list:
+        entry_mode = pyip.inputMenu(['One category at a time',
+                                     'All categories in one line',
+                                     'All categories from CSV file'],
+                                    prompt=colored("Select how to enter "
+                                    f"{self.color_worksheet_names(worksheet)}"
+                                                   " values:\n", "yellow"),
+                                    numbered=True)
 
-            if item not in ('TOTAL', 'SURPLUS'):
+        if entry_mode == 'One category at a time':
+            amounts = self.input_values_one_by_one(worksheet, month,
+                                                   value, categories)
 
-                self.clear_display()
+        else:
+            amounts = self.input_values_at_once(worksheet, month, value,
+                                                categories, entry_mode)
+
+        spendings = CategoryRow.from_amounts(month, categories,
+                                             amounts, self.money)
 
-                if worksheet == 'needs':
-                    name_item = colored(item, "red")
+        self.clear_display()
 
-                elif worksheet == 'wants':
-                    name_item = colored(item, "green")
+        print(f"\nYour summarized cost for "
+              f"{self.color_worksheet_names(worksheet)} "
+              f"is: {spendings.total}")
+        time.sleep(5)
 
-                print(f"Your {self.color_worksheet_names(worksheet)} "
-                      f"value for the {month} is: {value}")
-                spendings[item] = pyip.inputFloat(
-                                                  prompt=f"\nEnter value "
-                                                  f"for {name_item}: \n"
-                                                 )
-                value -= spendings[item]
+        return spendings
 
-            else:
+    def input_values_one_by_one(self, worksheet, month, value, categories):
+        """
+        Returns values entered separately for every category.
+        """
+
+        amounts = []
+
+        for item in categories:
+
+            self.clear_display()
+
+            if worksheet == 'needs':
+                name_item = colored(item, "red")
+
+            elif worksheet == 'wants':
+                name_item = colored(item, "green")
+
+            print(f"Your {self.color_worksheet_names(worksheet)} "
+                  f"value for the {month} is: {value}")
+            amounts.append(pyip.inputFloat(
+                                           prompt=f"\nEnter value "
+                                           f"for {name_item}: \n",
+                                           blockRegexes=NOT_FINITE
+                                          ))
+            value -= amounts[-1]
+
+        return amounts
+
+    def input_values_at_once(self, worksheet, month, value, categories,
+                             entry_mode):
+        """
+        Returns values for all categories entered in one line
+        or loaded from CSV file with Category,Value rows.
+        """
+
+        while True:
+
+            self.clear_display()
+            print(f"Your {self.color_worksheet_names(worksheet)} "
+                  f"value for the {month} is: {value}")
+            print(f"\nCategories: {', '.join(categories)}")
+
+            try:
+                if entry_mode == 'All categories in one line':
+                    print(f"\nExample: {categories[0]}=100 "
+                          f"{categories[-1]}=50")
+                    line = pyip.inputStr(colored("\nEnter values for all "
+                                                 "categories:\n", "yellow"))
+                    pairs = self.split_category_line(line)
+
+                else:
+                    print(f"\nExample row: {categories[0]},100")
+                    filepath = pyip.inputFilepath(colored("\nEnter path to "
+                                                          "CSV file:\n",
+                                                          "yellow"),
+                                                  mustExist=True)
+                    pairs = self.read_category_csv(filepath)
+
+                return self.parse_category_values(pairs, categories)
+
+            except (OSError, UnicodeDecodeError, csv.Error) as error:
+                print(f"\nThe file could not be read: {error}")
+                time.sleep(5)
+
+            except ValueError as error:
+                print(f"\n{error}")
+                time.sleep(5)
+
+    @staticmethod
+    def split_category_line(line):
+        """
+        Returns category and value pairs from Category=Value entries
+        separated with whitespaces. Every entry must be a single pair.
+        """
+
+        pairs = []
+
+        for entry in line.split():
+            if not re.fullmatch(r'[^=,]+=[^=,]+', entry):
+                raise ValueError(f"Incorrect entry: {entry}. Use "
+                                 "Category=Value pairs separated with "
+                                 "spaces, without commas.")
+
+            pairs.append(entry.split('='))
+
+        return pairs
+
+    @staticmethod
+    def read_category_csv(filepath):
+        """
+        Returns category and value rows from CSV file.
+        The first row is skipped only if it is a Category,Value header.
+        """
+
+        with open(filepath, newline='', encoding='utf-8') as file:
+            rows = [row for row in csv.reader(file) if row]
+
+        if rows and [item.strip().lower() for item in rows[0]] == \
+                ['category', 'value']:
+            rows = rows[1:]
+
+        return rows
+
+    @staticmethod
+    def parse_category_values(pairs, categories):
+        """
+        Validates category and value pairs against worksheet categories.
+        Returns values in the categories order.
+        """
+
+        names = {item.lower(): item for item in categories}
+        values = {}
+
+        for pair in pairs:
+            if len(pair) != 2:
+                raise ValueError(f"Incorrect entry: {','.join(pair)}. "
+                                 "Use category and value pairs.")
+
+            name, amount = (item.strip() for item in pair)
+
+            if name.lower() not in names:
+                raise ValueError(f"{name} is not one of your categories.")
+
+            if names[name.lower()] in values:
+                raise ValueError(f"{name} was entered more than once.")
+
+            try:
+                number = float(amount)
+
+            except ValueError:
+                number = math.nan
 
-                if item == 'TOTAL':
-                    spendings[item] = sum(spendings.values())
+            if not math.isfinite(number):
+                raise ValueError(f"Value for {name} is not a number: "
+                                 f"{amount}")
 
-                elif item == 'SURPLUS':
-                    spendings[item] = self.money - spendings['TOTAL']
+            values[names[name.lower()]] = number
+
+        missing = [item for item in categories if item not in values]
+
+        if missing:
+            raise ValueError(f"Missing values for: {', '.join(missing)}")
+
+        return [values[item] for item in categories]
+
+    def spendings_range(self, worksheet, month, spendings):
+        """
+        Returns batch update data with spendings for the month row
+        of Needs or Wants worksheet, in the categories order.
+        """
+
+        month_cell = self.find_cell(worksheet, month)
+        values = spendings.row_values()
+        first_cell = rowcol_to_a1(month_cell.row, month_cell.col + 1)
+        last_cell = rowcol_to_a1(month_cell.row, month_cell.col + len(values))
+
+        return {'range': f"'{worksheet}'!{first_cell}:{last_cell}",
+                'values': [values]}
+
+    def read_cell_value(self, cell_range, render='UNFORMATTED_VALUE'):
+        """
+        Returns value of the cell, empty string if it is blank.
+        Value is unformatted, unless other render option is passed.
+        """
+
+        response = self.session.sheet.values_get(cell_range, params={
+            'valueRenderOption': render})
+
+        values = response.get('values') or [['']]
+
+        return values[0][0] if values[0] else ''
+
+    def transfers_worksheet(self):
+        """
+        Returns transfers worksheet, added with its header row
+        if the spreadsheet does not have it yet.
+        """
+
+        try:
+            return self.session.worksheet('transfers')
+
+        except WorksheetNotFound:
+            pass
+
+        try:
+            worksheet = self.session.sheet.add_worksheet(
+                'transfers', 1, len(TRANSFER_FIELDS))
+
+        except APIError:
+            # Added by another session in the meantime
+            return self.session.worksheet('transfers')
+
+        # Appended, so transfers of other sessions are never overwritten
+        worksheet.append_row(TRANSFER_FIELDS)
+
+        return worksheet
+
+    @staticmethod
+    def cell_data(value):
+        """
+        Returns batchUpdate cell data, strings starting with = are formulas.
+        """
+
+        if isinstance(value, str):
+            kind = 'formulaValue' if value.startswith('=') else 'stringValue'
+
+        else:
+            kind = 'numberValue'
+
+        return {'userEnteredValue': {kind: value}}
+
+    def update_cells_request(self, cell_range, values):
+        """
+        Returns batchUpdate request writing values from the range start.
+        """
+
+        worksheet, cell = cell_range.rsplit('!', 1)
+        row, col = a1_to_rowcol(cell.split(':')[0])
+
+        return {'updateCells': {
+            'start': {'sheetId': self.session.worksheet(
+                          worksheet.strip("'")).id,
+                      'rowIndex': row - 1, 'columnIndex': col - 1},
+            'rows': [{'values': [self.cell_data(value) for value in row]}
+                     for row in values],
+            'fields': 'userEnteredValue'}}
+
+    def append_transfer_request(self, month, column, amount, transfer_set):
+        """
+        Returns batchUpdate request appending transfer row.
+        Appends of many sessions are applied one after another.
+        """
+
+        time_now = self.session.clock().isoformat(sep=' ', timespec='seconds')
+        row = [month, column, amount, time_now, transfer_set]
+
+        return {'appendCells': {
+            'sheetId': self.transfers_worksheet().id,
+            'rows': [{'values': [self.cell_data(value) for value in row]}],
+            'fields': 'userEnteredValue'}}
+
+    def transfer_cell(self, month, column):
+        """
+        Returns range of the column cell of the month in general worksheet.
+        """
+
+        month_row = self.find_cell('general', month).row
+        column_col = self.find_cell('general', column).col
+
+        return f"'general'!{rowcol_to_a1(month_row, column_col)}"
+
+    def new_transfer_set(self, month, column, value):
+        """
+        Returns new transfer set name and batchUpdate requests
+        starting it with the value.
+        The general cell sums only transfers of this set from now on.
+        """
+
+        transfer_set = uuid4().hex
+        cell_range = self.transfer_cell(month, column)
+
+        return transfer_set, [
+            self.append_transfer_request(month, column, value, transfer_set),
+            self.update_cells_request(
+                cell_range, [[TRANSFER_FORMULA.format(transfer_set)]])]
+
+    def set_transfer_value(self, month, column, value):
+        """
+        Sets the column value of the month in general worksheet
+        as a new transfer set, transfers made before are not counted.
+        """
 
         self.clear_display()
+        print(f"Updating {column} in worksheet...\n")
+        time.sleep(3)
 
-        print(f"\nUpdating {self.color_worksheet_names(worksheet)} "
-              "worksheet with passed values...")
+        requests = self.new_transfer_set(month, column, value)[1]
+        self.session.sheet.batch_update({'requests': requests})
+        self.session.prefetcher.discard('general')
+
+        print(f"{column.title()} updated successfully!\n\n")
         time.sleep(3)
 
-        for key, val in spendings.items():
+    def commit_transfer(self, month, column, amount, data=(), floor=None):
+        """
+        Adds amount to the column value of the month in general worksheet.
+        The transfer is appended as a row of transfers worksheet and the
+        general cell sums rows of its set, so transfers of concurrent
+        sessions are all counted without any lock.
+        Without floor, the transfer and passed data are written
+        in one atomic batch request. With floor, the transfer is reverted
+        if the new value is lower, otherwise data is written after it.
+        Returns new value or None if it would be lower than the floor.
+        """
+
+        cell_range = self.transfer_cell(month, column)
+        formula = str(self.read_cell_value(cell_range, 'FORMULA'))
+        found = TRANSFER_SET.search(formula)
+        requests = []
 
-            if key != 'SURPLUS':
-                key_location = SHEET.worksheet(worksheet).find(key)
-                SHEET.worksheet(worksheet).update_cell(month_cell.row,
-                                                       key_location.col, val)
+        if found:
+            transfer_set = found.group(1)
 
-        print(f"\n{self.color_worksheet_names(worksheet)} "
-              "worksheet updated successfully!")
-        time.sleep(3)
+        else:
+            # Value typed in the spreadsheet starts a new transfer set
+            try:
+                value = parse_amount(self.read_cell_value(cell_range))
 
-        print(f"\nYour summarized cost for "
-              f"{self.color_worksheet_names(worksheet)} "
-              f"is: {spendings['TOTAL']}")
-        time.sleep(5)
+            except ValueError:
+                print(f"\nSomething went wrong. Check if {column} value for "
+                      f"{month} in spreadsheet contains only numbers.")
+                self.restart_program()
 
-        return spendings
+            transfer_set, requests = self.new_transfer_set(month, column,
+                                                           value)
+
+        requests.append(self.append_transfer_request(month, column, amount,
+                                                     transfer_set))
+        data_requests = [self.update_cells_request(item['range'],
+                                                   item['values'])
+                         for item in data]
+
+        if floor is None:
+            requests += data_requests
+            data_requests = []
+
+        self.session.sheet.batch_update({'requests': requests})
+        new_value = parse_amount(self.read_cell_value(cell_range))
+
+        if floor is not None and new_value < floor:
+            data_requests = [self.append_transfer_request(
+                month, column, -amount, transfer_set)]
+            new_value = None
+
+        if data_requests:
+            self.session.sheet.batch_update({'requests': data_requests})
+
+        prefetcher = self.session.prefetcher
+        prefetcher.discard('general')
+
+        for item in data:
+            prefetcher.discard(item['range'].split("'")[1])
+
+        return new_value
 
     def clear_row(self, worksheet, month):
         """
         Function to clear cells for the selected month and worksheet.
+        Only category cells are cleared, the month name stays in place.
         """
 
         self.clear_display()
 
-        month_cell = SHEET.worksheet(worksheet).find(month)
+        layout = self.get_layout(worksheet)
+        month_row = layout.months[month]
 
         print(f"\nClearing {month} row in "
               f"{self.color_worksheet_names(worksheet)} worksheet...")
         time.sleep(3)
 
-        SHEET.worksheet(worksheet).batch_clear(
-            [f"{month_cell.row}:{month_cell.row}"])
-        SHEET.worksheet(worksheet).update_cell(
-            month_cell.row, month_cell.col, month)
+        if layout.width > layout.month_col:
+            self.session.worksheet(worksheet).batch_clear([
+                f"{rowcol_to_a1(month_row, layout.month_col + 1)}:"
+                f"{rowcol_to_a1(month_row, layout.width)}"])
+            self.session.prefetcher.discard(worksheet)
 
         print(f"\n{month.capitalize()} row in "
               f"{self.color_worksheet_names(worksheet)} "
@@ -155,8 +551,8 @@ class UpdateSpreadsheetMixin:
 
     def clear_worksheet(self, worksheet):
         """
-        Clears the entire worksheet and populates the first column
-        with previously caught values.
+        Clears categories and their values in the worksheet.
+        Month column is left as it is.
         """
 
         self.clear_display()
@@ -164,16 +560,14 @@ class UpdateSpreadsheetMixin:
               "worksheet...\n")
         time.sleep(3)
 
-        get_all_values = SHEET.worksheet('needs').get_all_values()
-        SHEET.worksheet(worksheet).clear()
-        row_values = []
+        layout = self.get_layout(worksheet)
 
-        for li_elem in get_all_values:
-            li_li = []
-            li_li.append(li_elem[0])
-            row_values.append(li_li)
-
-        SHEET.worksheet(worksheet).insert_rows(row_values)
+        if layout.width > layout.month_col:
+            self.session.worksheet(worksheet).batch_clear([
+                f"{rowcol_to_a1(layout.header_row, layout.month_col + 1)}:"
+                f"{rowcol_to_a1(layout.last_row, layout.width)}"])
+            layout.headers = layout.headers[:layout.month_col]
+            self.session.prefetcher.discard(worksheet)
 
         print(f"{self.color_worksheet_names(worksheet)} "
               "worksheet is now empty.\n")
@@ -190,11 +584,18 @@ class UpdateSpreadsheetMixin:
         time.sleep(3)
 
         split_categories = categories.split(',')
-        month = SHEET.worksheet(worksheet).find(cell)
-
-        for num, item in enumerate(split_categories):
-            if item != 'SURPLUS':
-                SHEET.worksheet(worksheet).update_cell(month.row, num+2, item)
+        headers = [item for item in split_categories if item != 'SURPLUS']
+        layout = self.get_layout(worksheet)
+        month = self.find_cell(worksheet, cell)
+
+        first_cell = rowcol_to_a1(month.row, month.col + 1)
+        last_cell = rowcol_to_a1(month.row, month.col + len(headers))
+        self.session.sheet.values_batch_update(body={
+            'valueInputOption': 'USER_ENTERED',
+            'data': [{'range': f"'{worksheet}'!{first_cell}:{last_cell}",
+                      'values': [headers]}]})
+        layout.headers = (*layout.headers[:month.col], *headers)
+        self.session.prefetcher.discard(worksheet)
 
         print(f"\n{self.color_worksheet_names(worksheet)} "
               "worksheet updated successfully!")
@@ -206,10 +607,14 @@ class UpdateSpreadsheetMixin:
         """
         Method fethes categories from spreadsheet.
         Returns flow value for program operation.
+        Header row is read from the spreadsheet, so categories typed
+        in it after the layout was created are used too.
         """
 
-        all_values = SHEET.worksheet(worksheet).get_all_values()
-        get_categories = all_values[0][1:]
+        layout = self.get_layout(worksheet)
+        layout.headers = tuple(self.session.worksheet(worksheet).row_values(
+            layout.header_row))
+        get_categories = layout.headers[layout.month_col:]
         categories_string = ''
 
         for item in get_categories:
@@ -329,6 +734,6 @@ class UpdateSpreadsheetMixin:
                 flow = get_cat_elem[1]
 
             else:
-                os.execl(sys.executable, sys.executable, *sys.argv)
+                self.reload_program()
 
         return user_cat + ',TOTAL' + ',SURPLUS'
@@ -0,0 +1,39 @@
+"""
+Module to generate year-end reports for Personal Budget Manager
+spreadsheets, e.g.:
+python3 report.py --plan 70/20/10 --format csv html personal-budget
+"""
+
+import argparse
+
+from classes.records import PLANS
+from classes.report import REPORT_WRITERS, generate_reports
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Generate year-end "
+                                     "budget reports.")
+    parser.add_argument('spreadsheets', nargs='*',
+                        default=['personal-budget'],
+                        help="names of spreadsheets to report on")
+    parser.add_argument('--plan', choices=PLANS, default='50/30/20',
+                        help="budget plan to compare spendings with, "
+                        "used for every spreadsheet and month")
+    parser.add_argument('--format', nargs='+', dest='formats',
+                        choices=REPORT_WRITERS, default=['csv'],
+                        help="formats of report files")
+    parser.add_argument('--output', default='reports',
+                        help="directory for report files")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of processes generating reports")
+    args = parser.parse_args()
+
+    for name, paths, error in generate_reports(args.spreadsheets, args.plan,
+                                               args.formats, args.output,
+                                               args.workers):
+        if error:
+            print(f"Report for {name} failed: {error}")
+
+        for path in paths:
+            print(f"Report saved to {path}")
@@ -4,28 +4,53 @@ Main module to start Personal Budget Manager program.
 
 from classes.budget import Budget
 from classes.elements import Needs, Wants, Savings
+from classes.session import QuitSession, RestartSession, Session
 
 
-if __name__ == '__main__':
+def run_budget(session):
+    """
+    Runs the program flow from Main Menu to the last worksheet.
+    """
 
     # Create "budget" object.
-    budget = Budget()
+    budget = Budget(session)
 
     # Create "save" object.
-    save = Savings(budget.plan_elements[3], budget.income[1])
+    Savings(session, budget.plan_elements.savings, budget.income[1])
 
     # Create "needs" object and handle its calculations.
-    needs = Needs(budget.plan_elements[1])
+    needs = Needs(session, budget.plan_elements.needs)
     needs_spendings = needs.input_values_for_worksheet('needs',
                                                        budget.income[1],
                                                        needs.money)
-    budget.manage_your_budget('needs', needs_spendings['SURPLUS'],
-                              budget.plan_elements[3], budget.income[1])
+    budget.manage_your_budget('needs', needs_spendings, budget.income[1])
 
     # Create "wants" object and handle its calculations.
-    wants = Wants(budget.plan_elements[2])
+    wants = Wants(session, budget.plan_elements.wants)
     wants_spendings = wants.input_values_for_worksheet('wants',
                                                        budget.income[1],
                                                        wants.money)
-    budget.manage_your_budget('wants', wants_spendings['SURPLUS'],
-                              budget.plan_elements[3], budget.income[1])
+    budget.manage_your_budget('wants', wants_spendings, budget.income[1])
+
+
+if __name__ == '__main__':
+
+    # Create "session" object with the spreadsheet connection,
+    # closed when the program ends.
+    with Session() as session:
+
+        # Start again from Main Menu until the user quits.
+        while True:
+            try:
+                run_budget(session)
+
+            except RestartSession:
+                session.restart()
+                continue
+
+            except QuitSession:
+                pass
+
+            break
+
+        session.save_layouts()